@@ -6,8 +6,8 @@ import logging
 import argparse
 
 from reconciliation import (
+    load_amazon_orders,
     parse_bank_statements,
-    preprocess_amazon_orders,
     process_refunds,
     reconcile_amazon_orders,
 )
@@ -34,6 +34,27 @@ def confirm_overwrite(file_path: str) -> bool:
                 return True
     return True
 
+def positive_int(value: str) -> int:
+    """
+    Argparse type for options that must be a whole number of at least 1.
+
+    Args:
+        value (str): The raw option value.
+
+    Returns:
+        int: The parsed value.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value isn't an integer of at least 1.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
 def main():
     """
     Parse any arguments and run the statement parser + reconciler.
@@ -46,6 +67,10 @@ def main():
                         help="Path to save the reconciled transactions CSV. Defaults to 'matched_transactions.csv'.")
     parser.add_argument("--quiet", action="store_true", help="Suppress output of messages.")
     parser.add_argument("-f", "--force", action="store_true", help="Overwrite output CSV without confirmation.")
+    parser.add_argument("-j", "--jobs", type=positive_int, default=None,
+                        help="Number of statements to parse in parallel. Defaults to the number of CPUs.")
+    parser.add_argument("--year", type=int, default=None,
+                        help="Statement year, for parsers whose transaction dates omit it (e.g. 'rbc_pdf'). Defaults to 2024.")
 
     args = parser.parse_args()
 
@@ -55,15 +80,16 @@ def main():
     logging.basicConfig(level=logging.INFO if not args.quiet else logging.ERROR, format="%(message)s")
 
     logging.info(f"Running statement parser on {args.statement}...")
-    cc_transactions, statement_refunds = parse_bank_statements(args.statement, args.parser_name)
+    cc_transactions, statement_refunds = parse_bank_statements(args.statement, args.parser_name, args.jobs, args.year)
 
     logging.info(f"Found {len(cc_transactions)} matching statement line items and {len(statement_refunds)} refunds.")
 
     logging.info(f"\nReconciling bank statement(s) against amazon order data in {args.amazon_csv}...")
-    matched_data, unmatched_cc, unmatched_amazon = reconcile_amazon_orders(cc_transactions, args.amazon_csv)
+    amazon_orders = load_amazon_orders(args.amazon_csv)
+    matched_data, unmatched_cc, unmatched_amazon = reconcile_amazon_orders(cc_transactions, amazon_orders)
 
     logging.info(f"\nProcessing refunds...")
-    matched_refunds, unmapped_amazon_refunds = process_refunds(args.amazon_csv, statement_refunds)
+    matched_refunds, unmapped_amazon_refunds = process_refunds(amazon_orders, statement_refunds)
 
     if not unmapped_amazon_refunds.empty:
         logging.info("\nUnmapped Amazon Refunds:")
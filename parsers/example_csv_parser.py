@@ -8,12 +8,10 @@ def parse_example_csv(file_path):
         - description: Description of the transaction
         - amount: Transaction amount
     """
-    transactions = []
     data = pd.read_csv(file_path)
-    for _, row in data.iterrows():
-        transactions.append({
-            "date": pd.to_datetime(row["Transaction Date"]),
-            "description": row["Description"],
-            "amount": float(row["Amount"])
-        })
-    return transactions
+    transactions = pd.DataFrame({
+        "date": pd.to_datetime(data["Transaction Date"]),
+        "description": data["Description"],
+        "amount": data["Amount"].astype(float),
+    })
+    return transactions.to_dict(orient="records")
\ No newline at end of file
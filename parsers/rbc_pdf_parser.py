@@ -1,13 +1,75 @@
-import pdfplumber
 import re
 from datetime import datetime
 
-EXCLUDES = [
+import pdfplumber
+
+try:
+    # Optional, faster text extraction backend
+    import pymupdf
+except ImportError:
+    pymupdf = None
+
+EXCLUDES = (
     "AMAZONWEBSERVICES",    # Exclude AWS
     "AMAZON.CAPRIMEMEMBER", # Exclude Amazon Prime
-]
+)
+
+# Regex for matching transaction lines
+TRANSACTION_REGEX = re.compile(r'(\w{3}\d{1,2}) .* (?:AMZN|AMAZON)[^$]* (-?\$\d[.,\d]+)', re.IGNORECASE)
+
+# Month abbreviations used in statement dates (e.g. 'JAN05')
+MONTHS = {
+    'JAN': 1, 'FEB': 2, 'MAR': 3, 'APR': 4, 'MAY': 5, 'JUN': 6,
+    'JUL': 7, 'AUG': 8, 'SEP': 9, 'OCT': 10, 'NOV': 11, 'DEC': 12,
+}
 
-def parse_rbc_pdf(file_path: str) -> tuple[list[dict], list[dict]]:
+# Max vertical distance (in points) between words on the same text line
+LINE_TOLERANCE = 3
+
+def _pymupdf_page_text(page) -> str:
+    """
+    Rebuild the text lines of a PyMuPDF page from its words.
+
+    Statement columns are separate text runs, which get_text("text") returns
+    on separate lines. Grouping words by vertical position and ordering them
+    left to right puts each table row back on one line, like pdfplumber's
+    extract_text().
+    """
+    lines = []
+    for x0, _, _, y1, word, *_ in sorted(page.get_text("words"), key=lambda word: (word[3], word[0])):
+        if lines and y1 - lines[-1][0] <= LINE_TOLERANCE:
+            lines[-1][1].append((x0, word))
+        else:
+            lines.append((y1, [(x0, word)]))
+    return '\n'.join(' '.join(word for _, word in sorted(words)) for _, words in lines)
+
+def extract_page_texts(file_path: str):
+    """
+    Yield the plain text of each page in a PDF.
+
+    Uses PyMuPDF when it's installed since it's much faster for plain text
+    extraction, otherwise pdfplumber. pdfplumber pages are closed as soon as
+    their text is extracted so their layout objects don't accumulate.
+
+    Args:
+        file_path (str): Path to the PDF file.
+
+    Yields:
+        str: The text of each page, in page order.
+    """
+    if pymupdf is not None:
+        with pymupdf.open(file_path) as doc:
+            for page in doc:
+                yield _pymupdf_page_text(page)
+    else:
+        with pdfplumber.open(file_path) as pdf:
+            for page in pdf.pages:
+                text = page.extract_text() or ''
+                page.flush_cache()
+                page.close()
+                yield text
+
+def parse_rbc_pdf(file_path: str, year: int = 2024) -> tuple[list[dict], list[dict]]:
     """
     Parse an RBC credit card statement PDF.
 
@@ -16,60 +78,61 @@ def parse_rbc_pdf(file_path: str) -> tuple[list[dict], list[dict]]:
 
     Args:
         file_path (str): Path to the RBC credit card statement PDF.
+        year (int): Year of the statement, since transaction dates only
+        include the month and day.
 
     Returns:
         tuple[list[dict], list[dict]]:
             - list[dict]: Regular transactions.
             - list[dict]: Refund transactions with negative amounts.
     """
-    import pdfplumber
-    import re
-    from datetime import datetime
-
     transactions = []
     refunds = []
 
-    # Define regex for matching transaction lines
-    transaction_regex = re.compile(r'(\w{3}\d{1,2}) .* (?:AMZN|AMAZON)[^$]* (-?\$\d[.,\d]+)', re.IGNORECASE)
+    for text in extract_page_texts(file_path):
+        lines = text.split('\n')
 
-    with pdfplumber.open(file_path) as pdf:
-        for page in pdf.pages:
-            text = page.extract_text()
-            lines = text.split('\n')
+        for line in lines:
+            # Clean up special characters
+            line = line.replace('\xa0', ' ').strip()
 
-            for line in lines:
-                # Clean up special characters
-                line = line.replace('\xa0', ' ').strip()
+            # Cheap substring check to skip non-Amazon lines before running the regex
+            upper = line.upper()
+            if 'AMAZON' not in upper and 'AMZN' not in upper:
+                continue
 
-                match = transaction_regex.match(line)
-                if not match:
-                    continue
+            match = TRANSACTION_REGEX.match(line)
+            if not match:
+                continue
+
+            date_str, amount = match.groups()
 
-                date_str, amount = match.groups()
-
-                try:
-                    # Parse date and amount
-                    date = datetime.strptime(date_str + ' 2024', "%b%d %Y")
-                    amount = float(amount.replace('$', '').replace(',', ''))
-                    # Check for exclusions
-                    if any(excluded in line.upper() for excluded in EXCLUDES):
-                        continue
-
-                    # Separate regular transactions and refunds
-                    if amount < 0:
-                        refunds.append({
-                            "date": date,
-                            "description": line,
-                            "amount": amount
-                        })
-                    else:
-                        transactions.append({
-                            "date": date,
-                            "description": line,
-                            "amount": amount
-                        })
-                except ValueError:
-                    # Silently skip lines that fail parsing
+            try:
+                # Parse date and amount
+                month = MONTHS.get(date_str[:3].upper())
+                if month is None:
                     continue
+                date = datetime(year, month, int(date_str[3:]))
+                amount = float(amount.replace('$', '').replace(',', ''))
+                # Check for exclusions
+                if any(excluded in upper for excluded in EXCLUDES):
+                    continue
+
+                # Separate regular transactions and refunds
+                if amount < 0:
+                    refunds.append({
+                        "date": date,
+                        "description": line,
+                        "amount": amount
+                    })
+                else:
+                    transactions.append({
+                        "date": date,
+                        "description": line,
+                        "amount": amount
+                    })
+            except ValueError:
+                # Silently skip lines that fail parsing
+                continue
 
-    return transactions, refunds
\ No newline at end of file
+    return transactions, refunds
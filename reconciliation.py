@@ -1,54 +1,155 @@
+import inspect
 import logging
 import pandas as pd
 import re
 
+from bisect import bisect_left
 from itertools import combinations
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
 
 from parsers import get_parser
 
-def parse_bank_statements(file_or_glob: str, parser_name: str) -> tuple[list[dict], list[dict]]:
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+# Amazon CSV columns used for reconciliation, and the types to read them as.
+# Amounts are read as text and converted in load_amazon_orders(), since
+# pending orders can hold placeholders like '?' instead of a number.
+AMAZON_COLUMNS = {
+    'order id': 'string',
+    'date': 'string',
+    'total': 'string',
+    'payments': 'string',
+    'refund': 'string',
+}
+
+# Amazon CSV columns holding dollar amounts
+AMOUNT_COLUMNS = ('total', 'refund')
+
+# How far a statement transaction's date may fall before / after the Amazon order date
+MATCH_WINDOW_BEFORE = pd.Timedelta(days=1)
+MATCH_WINDOW_AFTER = pd.Timedelta(days=2)
+
+# Regex for extracting the date and amount from a split payment entry
+PAYMENT_REGEX = re.compile(r'(\w+ \d{1,2}, \d{4}):\s*\$([-\d,.]+)')
+
+def parse_bank_statements(file_or_glob: str, parser_name: str, jobs: int | None = None, year: int | None = None) -> tuple[list[dict], list[dict]]:
     """
     Parse one or more bank statements using the specified parser.
 
+    When more than one file matches, the files are parsed in parallel
+    worker processes.
+
     Args:
         file_or_glob (str): Path to a single file or a glob pattern (e.g., '*.pdf').
         parser_name (str): Machine name of the parser to use (e.g., 'rbc_pdf').
+        jobs (int | None): Maximum number of worker processes. Defaults to the
+        number of CPUs; 1 parses the files serially.
+        year (int | None): Statement year, passed to parsers whose transaction
+        dates don't include it (e.g. 'rbc_pdf'). Defaults to the parser's own default.
 
     Returns:
         tuple[list[dict], list[dict]]:
             - list[dict]: Regular transactions.
             - list[dict]: Refund transactions.
+
+    Raises:
+        ValueError: If jobs is less than 1, or a year is given and the parser
+        doesn't accept one.
     """
     from glob import glob
 
+    if jobs is not None and jobs < 1:
+        raise ValueError(f"jobs must be at least 1, got {jobs}.")
+
     parser_func = get_parser(parser_name)
+    if year is not None:
+        if 'year' not in inspect.signature(parser_func).parameters:
+            raise ValueError(f"Parser '{parser_name}' doesn't support setting the statement year.")
+        parser_func = partial(parser_func, year=year)
     transactions = []
     refunds = []
 
     # Expand glob pattern and parse each file
     file_paths = glob(file_or_glob) if "*" in file_or_glob else [file_or_glob]
 
-    for file_path in file_paths:
-        logging.info(f"Reading {file_path}...")
-        parsed_data = parser_func(file_path)
-
-        if isinstance(parsed_data, tuple) and len(parsed_data) == 2:
-            # If the parser returns (transactions, refunds), unpack them
-            file_transactions, file_refunds = parsed_data
-            transactions.extend(file_transactions)
-            refunds.extend(file_refunds)
-        elif isinstance(parsed_data, list):
-            # If the parser returns a single list, treat all as normal transactions
-            transactions.extend(parsed_data)
-        else:
-            raise ValueError(f"Unexpected return format from parser {parser_name} for file {file_path}")
+    # Results are consumed lazily, in file order, so progress is logged as
+    # each file finishes
+    parallel = len(file_paths) > 1 and jobs != 1
+    with ProcessPoolExecutor(max_workers=jobs) if parallel else nullcontext() as executor:
+        results = executor.map(parser_func, file_paths) if parallel else map(parser_func, file_paths)
+
+        for file_path, parsed_data in zip(file_paths, results):
+            logging.info(f"Parsed {file_path}.")
+
+            if isinstance(parsed_data, tuple) and len(parsed_data) == 2:
+                # If the parser returns (transactions, refunds), unpack them
+                file_transactions, file_refunds = parsed_data
+                transactions.extend(file_transactions)
+                refunds.extend(file_refunds)
+            elif isinstance(parsed_data, list):
+                # If the parser returns a single list, treat all as normal transactions
+                transactions.extend(parsed_data)
+            else:
+                raise ValueError(f"Unexpected return format from parser {parser_name} for file {file_path}")
 
     return transactions, refunds
 
-def preprocess_amazon_orders(amazon_csv_path: str) -> pd.DataFrame:
+def to_cents(amounts: pd.Series) -> pd.Series:
+    """
+    Convert dollar amounts to integer cents.
+
+    Amounts are matched on cents rather than comparing floats with a
+    tolerance.
+
+    Args:
+        amounts (pd.Series): Dollar amounts.
+
+    Returns:
+        pd.Series: Amounts in cents as nullable Int64 (missing amounts are <NA>).
+    """
+    return (amounts.astype(float) * 100).round().astype('Int64')
+
+def load_amazon_orders(amazon_csv_path: str) -> pd.DataFrame:
     """
-    Preprocess the Amazon orders CSV to handle split payments.
+    Load the Amazon orders CSV.
+
+    The CSV is read once and shared by order reconciliation and refund
+    processing. Only the columns in AMAZON_COLUMNS are loaded, using
+    PyArrow's multithreaded CSV reader when it's installed.
+
+    Args:
+        amazon_csv_path (str): Path to the Amazon orders CSV file.
+
+    Returns:
+        pd.DataFrame: The Amazon orders, with the 'date' column parsed as
+        datetime (invalid dates become NaT) and the amount columns as
+        numbers (non-numeric amounts become NaN).
+    """
+    # The pyarrow engine needs usecols as a list, so check the header for
+    # which of the columns are present
+    header = pd.read_csv(amazon_csv_path, nrows=0).columns
+    amazon_orders = pd.read_csv(
+        amazon_csv_path,
+        usecols=[column for column in header if column in AMAZON_COLUMNS],
+        dtype=AMAZON_COLUMNS,
+        engine='pyarrow' if pyarrow is not None else 'c',
+    )
+    amazon_orders['date'] = pd.to_datetime(amazon_orders['date'], errors='coerce')
+    for column in AMOUNT_COLUMNS:
+        if column in amazon_orders:
+            amazon_orders[column] = pd.to_numeric(amazon_orders[column], errors='coerce')
+
+    return amazon_orders
+
+def preprocess_amazon_orders(amazon_orders: pd.DataFrame) -> pd.DataFrame:
+    """
+    Preprocess the Amazon orders to handle split payments.
 
     The generated Amazon CSV has a 'payments' column that lists any split
     payments that would be multiple records on the bank statement. This will
@@ -57,52 +158,46 @@ def preprocess_amazon_orders(amazon_csv_path: str) -> pd.DataFrame:
     the rows 'amount' column will be used.
 
     Args:
-        amazon_csv_path (str): Path to the Amazon orders CSV file.
+        amazon_orders (pd.DataFrame): Amazon orders as returned by load_amazon_orders().
 
     Returns:
         pd.DataFrame: A DataFrame containing expanded rows with individual payment 
         entries. Each row includes all other fields duplicated, with 'date' and 
         'total' updated from the split 'payments' data.
     """
-    amazon_orders = pd.read_csv(amazon_csv_path)
-
-    # Parse 'date' column as datetime and skip rows with invalid dates
-    amazon_orders['date'] = pd.to_datetime(amazon_orders['date'], errors='coerce')
+    # Skip rows with invalid dates
     amazon_orders = amazon_orders.dropna(subset=['date'])
 
-    # Prepare a list to store expanded rows
-    expanded_rows = []
+    if 'payments' not in amazon_orders:
+        return amazon_orders.reset_index(drop=True)
 
-    for _, row in amazon_orders.iterrows():
-        payments = row.get('payments', None)
-        if pd.notna(payments) and isinstance(payments, str) and ';' in payments and ':' in payments:
-            # Normalize text: replace \xa0 (non-breaking space) and other special characters
-            payments = payments.replace('\xa0', ' ')
+    # Only rows with 'date: $amount' entries separated by semicolons are split
+    payments = amazon_orders['payments'].astype('string')
+    has_split = (payments.str.contains(';', regex=False, na=False)
+                 & payments.str.contains(':', regex=False, na=False))
 
-            # Split payments into individual entries, strip surrounding whitespace, and remove empty values.
-            payment_entries = [entry.strip() for entry in payments.split(';') if entry.strip()]
+    # Normalize text: replace \xa0 (non-breaking space), then split payments
+    # into individual entries (one per row, keeping the original index) and
+    # extract the date and amount from each. Entries that don't match are dropped.
+    payment_entries = (payments[has_split]
+                       .str.replace('\xa0', ' ', regex=False)
+                       .str.split(';')
+                       .explode()
+                       .str.strip())
+    extracted = payment_entries.str.extract(PAYMENT_REGEX).dropna()
 
-            for payment_entry in payment_entries:
-                # Extract date and amount from the payment entry
-                match = re.search(r'(\w+ \d{1,2}, \d{4}):\s*\$([-\d,.]+)', payment_entry)
-                if match:
-                    payment_date, payment_amount = match.groups()
-                    payment_date = pd.to_datetime(payment_date, errors='coerce')
-                    payment_amount = float(payment_amount.replace(',', ''))
+    # Duplicate all other fields and update date and total
+    split_rows = amazon_orders.loc[extracted.index].copy()
+    split_rows['date'] = pd.to_datetime(extracted[0], format='mixed', errors='coerce').to_numpy()
+    split_rows['total'] = extracted[1].str.replace(',', '', regex=False).astype(float).to_numpy()
 
-                    # Duplicate all other fields and update date and total
-                    expanded_row = row.to_dict()
-                    expanded_row['date'] = payment_date
-                    expanded_row['total'] = payment_amount
-                    expanded_rows.append(expanded_row)
-        else:
-            # Keep the original row if the payments column doesn't match.
-            expanded_rows.append(row.to_dict())
+    # Keep the original rows if the payments column doesn't match, in file order
+    expanded = pd.concat([amazon_orders[~has_split], split_rows]).sort_index(kind='stable')
 
-    return pd.DataFrame(expanded_rows)
+    return expanded.reset_index(drop=True)
 
 
-def reconcile_amazon_orders(cc_transactions: list[dict], amazon_csv_path: str) -> tuple[pd.DataFrame, list[dict], pd.DataFrame]:
+def reconcile_amazon_orders(cc_transactions: list[dict], amazon_orders: pd.DataFrame) -> tuple[pd.DataFrame, list[dict], pd.DataFrame]:
     """
     Reconcile Amazon orders with bank statement / CC transactions.
 
@@ -113,7 +208,7 @@ def reconcile_amazon_orders(cc_transactions: list[dict], amazon_csv_path: str) -
         cc_transactions (list[dict]): List of statement transactions, each 
         represented as a dictionary with keys: 'date', 'description', and 
         'amount'.
-        amazon_csv_path (str): Path to the preprocessed Amazon orders CSV file.
+        amazon_orders (pd.DataFrame): Amazon orders as returned by load_amazon_orders().
 
     Returns:
         tuple[pd.DataFrame, list[dict], pd.DataFrame]:
@@ -122,56 +217,71 @@ def reconcile_amazon_orders(cc_transactions: list[dict], amazon_csv_path: str) -
             - list[dict]: A list of unmatched transactions.
             - pd.DataFrame: A DataFrame of unmatched Amazon orders.
     """
-    # Preprocess the Amazon orders CSV
-    amazon_orders = preprocess_amazon_orders(amazon_csv_path)
-
-    matched_records = []
-    unmatched_cc = cc_transactions.copy()
-    unmatched_amazon = amazon_orders.copy()
-
-    matched_ids = []
-
-    # Match Amazon orders to bank statement transactions row by row
-    for _, amazon_row in amazon_orders.iterrows():
-        amazon_date = amazon_row['date']
-        amazon_amount = float(amazon_row['total'])
-        amazon_order_id = amazon_row['order id']
-
-        for cc_row in unmatched_cc:
-            cc_date = cc_row["date"]
-            cc_amount = cc_row["amount"]
-
-            # Check if date matches, is 1 day before, or is up to 2 days after, and amounts match
-            if (cc_date >= amazon_date - pd.Timedelta(days=1)
-                and cc_date <= amazon_date + pd.Timedelta(days=2)
-                and abs(cc_amount - amazon_amount) < 0.01):
-
-                # Match found, record the result
-                matched_records.append({
-                    "statement_transaction_date": cc_date,
-                    "statement_description": cc_row["description"],
-                    "statement_amount": cc_amount,
-                    "amazon_date": amazon_date,
-                    "amazon_amount": amazon_amount,
-                    "amazon_order_id": amazon_order_id,
-                })
-                unmatched_cc.remove(cc_row)
-
-                # If match found for this Amazon order; remove it from unmatched_amazon
-                unmatched_amazon = unmatched_amazon[unmatched_amazon['order id'] != amazon_order_id]
-                break
+    # Expand split payments into individual rows
+    amazon_orders = preprocess_amazon_orders(amazon_orders)
+
+    # Key both sides on integer cents so amounts can be joined exactly
+    cc_df = pd.DataFrame(cc_transactions, columns=['date', 'description', 'amount'])
+    cc_df['cents'] = to_cents(cc_df['amount'])
+    cc_df = cc_df.reset_index(names='cc_pos').dropna(subset=['cents'])
+
+    amazon_df = pd.DataFrame({
+        'date': amazon_orders['date'],
+        'amount': amazon_orders['total'].astype(float),
+        'order id': amazon_orders['order id'],
+    })
+    amazon_df['cents'] = to_cents(amazon_df['amount'])
+    amazon_df = amazon_df.reset_index(names='amazon_pos').dropna(subset=['cents'])
+
+    # Join on amount, then keep candidates where the statement date is 1 day
+    # before, on, or up to 2 days after the Amazon date
+    candidates = amazon_df.merge(cc_df, on='cents', suffixes=('_amazon', '_cc'))
+    candidates = candidates[
+        (candidates['date_cc'] >= candidates['date_amazon'] - MATCH_WINDOW_BEFORE)
+        & (candidates['date_cc'] <= candidates['date_amazon'] + MATCH_WINDOW_AFTER)
+    ].sort_values(['amazon_pos', 'cc_pos'])
+
+    # Each Amazon row takes the first unconsumed statement transaction, in
+    # statement order, the same as matching row by row. Both sides are
+    # tracked with positional flags so each check is a plain list lookup.
+    consumed = [False] * len(cc_transactions)
+    amazon_matched = [False] * len(amazon_orders)
+    matched_rows = []
+    for row, amazon_pos, cc_pos in zip(candidates.index.tolist(),
+                                       candidates['amazon_pos'].tolist(),
+                                       candidates['cc_pos'].tolist()):
+        if amazon_matched[amazon_pos] or consumed[cc_pos]:
+            continue
+        consumed[cc_pos] = True
+        amazon_matched[amazon_pos] = True
+        matched_rows.append(row)
+
+    matched = candidates.loc[matched_rows]
 
     # Create final DataFrame for matched records
-    matched_df = pd.DataFrame(matched_records)
+    matched_df = pd.DataFrame({
+        "statement_transaction_date": matched['date_cc'],
+        "statement_description": matched['description'],
+        "statement_amount": matched['amount_cc'],
+        "amazon_date": matched['date_amazon'],
+        "amazon_amount": matched['amount_amazon'],
+        "amazon_order_id": matched['order id'],
+    }).reset_index(drop=True)
+
+    unmatched_cc = [cc_row for cc_pos, cc_row in enumerate(cc_transactions) if not consumed[cc_pos]]
+    unmatched_amazon = amazon_orders[~amazon_orders['order id'].isin(matched['order id'])]
 
     return matched_df, unmatched_cc, unmatched_amazon
 
-def process_refunds(amazon_csv_path: str, statement_refunds: list[dict]) -> tuple[pd.DataFrame, pd.DataFrame]:
+def process_refunds(amazon_orders: pd.DataFrame, statement_refunds: list[dict]) -> tuple[pd.DataFrame, pd.DataFrame]:
     """
     Process refunds by matching Amazon refunds to statement refund transactions.
 
+    Each Amazon refund is matched to the earliest unmatched statement refund
+    for the same amount dated on or after the Amazon date.
+
     Args:
-        amazon_csv_path (str): Path to the Amazon orders CSV.
+        amazon_orders (pd.DataFrame): Amazon orders as returned by load_amazon_orders().
         statement_refunds (list[dict]): List of refund transactions from the statement, each containing:
             - 'date' (datetime): The date of the refund.
             - 'amount' (float): The refund amount (negative value).
@@ -181,38 +291,55 @@ def process_refunds(amazon_csv_path: str, statement_refunds: list[dict]) -> tupl
             - pd.DataFrame: Matched refunds.
             - pd.DataFrame: Unmapped Amazon refunds.
     """
-    # Load the Amazon CSV and filter only rows with refunds
-    amazon_orders = pd.read_csv(amazon_csv_path)
-    amazon_orders['date'] = pd.to_datetime(amazon_orders['date'], errors='coerce')
+    # Filter only rows with refunds
     refund_rows = amazon_orders[amazon_orders['refund'].notna()]
 
-    matched_refunds = []
-    unmapped_amazon_refunds = refund_rows.copy()
+    matched_refunds = {column: [] for column in (
+        "amazon_order_id",
+        "amazon_refund_amount",
+        "amazon_date",
+        "statement_refund_date",
+        "statement_refund_amount",
+    )}
+    matched_ids = set()
+
+    # Bucket statement refunds by amount in cents, each bucket sorted by date
+    statement_cents = to_cents(pd.Series([refund['amount'] for refund in statement_refunds], dtype=float)).abs()
+    refunds_by_cents = defaultdict(list)
+    for statement_refund, cents in zip(statement_refunds, statement_cents):
+        if pd.notna(cents):
+            refunds_by_cents[cents].append(statement_refund)
+    for bucket in refunds_by_cents.values():
+        bucket.sort(key=lambda refund: refund['date'])
+    dates_by_cents = {cents: [refund['date'] for refund in bucket] for cents, bucket in refunds_by_cents.items()}
 
     # Match Amazon refunds to statement refunds
-    for _, refund_row in refund_rows.iterrows():
-        amazon_date = refund_row['date']
-        amazon_refund_amount = float(refund_row['refund'])
-
-        for statement_refund in statement_refunds:
-            statement_date = statement_refund['date']
-            statement_amount = statement_refund['amount']
-
-            # Match on amount and ensure the statement date is after Amazon date
-            if (
-                abs(amazon_refund_amount - abs(statement_amount)) < 0.01
-                and statement_date >= amazon_date
-            ):
-                matched_refunds.append({
-                    "amazon_order_id": refund_row['order id'],
-                    "amazon_refund_amount": amazon_refund_amount,
-                    "amazon_date": amazon_date,
-                    "statement_refund_date": statement_date,
-                    "statement_refund_amount": statement_amount,
-                })
-                unmapped_amazon_refunds = unmapped_amazon_refunds[
-                    unmapped_amazon_refunds['order id'] != refund_row['order id']
-                ]
-                break
+    for order_id, amazon_date, amazon_refund_amount, refund_cents in zip(
+        refund_rows['order id'],
+        refund_rows['date'],
+        refund_rows['refund'].astype(float),
+        to_cents(refund_rows['refund']),
+    ):
+        bucket = refunds_by_cents.get(refund_cents)
+        if not bucket or pd.isna(amazon_date):
+            continue
+
+        # Find the first statement refund dated on or after the Amazon date;
+        # matched refunds are removed from the bucket so they're only used once
+        dates = dates_by_cents[refund_cents]
+        i = bisect_left(dates, amazon_date)
+        if i == len(bucket):
+            continue
+        dates.pop(i)
+        statement_refund = bucket.pop(i)
+
+        matched_refunds["amazon_order_id"].append(order_id)
+        matched_refunds["amazon_refund_amount"].append(amazon_refund_amount)
+        matched_refunds["amazon_date"].append(amazon_date)
+        matched_refunds["statement_refund_date"].append(statement_refund['date'])
+        matched_refunds["statement_refund_amount"].append(statement_refund['amount'])
+        matched_ids.add(order_id)
+
+    unmapped_amazon_refunds = refund_rows[~refund_rows['order id'].isin(matched_ids)]
 
     return pd.DataFrame(matched_refunds), unmapped_amazon_refunds
@@ -0,0 +1,46 @@
+import os
+import shutil
+from datetime import datetime
+
+import pytest
+
+from parsers import rbc_pdf_parser
+
+# One-page statement with each column (dates, description, amount) written as
+# a separate text run, the way bank statements lay out their tables:
+#   JAN05 JAN07 AMAZON.CA*AB12CD AMAZON.CA ON       $12.34
+#   JAN08 JAN09 TIM HORTONS #123                    $3.10
+#   FEB01 FEB02 AMZN Mktp CA*XY9 WWW.AMAZON.CA ON   -$45.00
+#   FEB03 FEB04 AMAZONWEBSERVICES AWS.AMAZON.CO WA  $1.00
+STATEMENT_PDF = os.path.join(os.path.dirname(__file__), "data", "rbc_statement.pdf")
+
+@pytest.mark.parametrize("backend", ["pymupdf", "pdfplumber"])
+def test_parse_columnar_statement(monkeypatch, backend):
+    if backend == "pymupdf":
+        pytest.importorskip("pymupdf")
+    else:
+        monkeypatch.setattr(rbc_pdf_parser, "pymupdf", None)
+
+    transactions, refunds = rbc_pdf_parser.parse_rbc_pdf(STATEMENT_PDF)
+
+    assert [(t["date"], t["amount"]) for t in transactions] == [(datetime(2024, 1, 5), 12.34)]
+    assert [(r["date"], r["amount"]) for r in refunds] == [(datetime(2024, 2, 1), -45.0)]
+    assert transactions[0]["description"] == "JAN05 JAN07 AMAZON.CA*AB12CD AMAZON.CA ON $12.34"
+
+def test_statement_year_is_passed_to_parser(tmp_path):
+    from reconciliation import parse_bank_statements
+
+    # Two files so the statements are parsed in worker processes
+    for name in ("statement1.pdf", "statement2.pdf"):
+        shutil.copy(STATEMENT_PDF, tmp_path / name)
+
+    transactions, refunds = parse_bank_statements(str(tmp_path / "*.pdf"), "rbc_pdf", jobs=2, year=2023)
+
+    assert [t["date"] for t in transactions] == [datetime(2023, 1, 5)] * 2
+    assert [r["date"] for r in refunds] == [datetime(2023, 2, 1)] * 2
+
+def test_statement_year_rejected_by_parser_without_year():
+    from reconciliation import parse_bank_statements
+
+    with pytest.raises(ValueError):
+        parse_bank_statements("statement.csv", "example_csv", year=2023)
@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from reconciliation import load_amazon_orders, process_refunds, reconcile_amazon_orders
+
+ORDER_COLUMNS = ["order id", "date", "total", "payments", "refund"]
+
+def load_orders(tmp_path, rows):
+    """Write Amazon order rows to a CSV and load it the way main.py does."""
+    path = tmp_path / "orders.csv"
+    pd.DataFrame(rows, columns=ORDER_COLUMNS).to_csv(path, index=False)
+    return load_amazon_orders(str(path))
+
+def transaction(date, amount, description="AMAZON.CA"):
+    return {"date": date, "description": description, "amount": amount}
+
+def test_load_orders_with_non_numeric_amounts(tmp_path):
+    orders = load_orders(tmp_path, [
+        ("A", "2024-01-05", "10.00", None, None),
+        ("B", "pending", "?", None, "?"),
+    ])
+
+    assert orders["total"].tolist()[0] == 10.00
+    assert orders["total"].isna().tolist() == [False, True]
+    assert orders["refund"].isna().all()
+
+@pytest.mark.parametrize("days, matches", [(-2, False), (-1, True), (0, True), (2, True), (3, False)])
+def test_match_date_window(tmp_path, days, matches):
+    orders = load_orders(tmp_path, [("A", "2024-01-10", "10.00", None, None)])
+    cc_transactions = [transaction(datetime(2024, 1, 10) + timedelta(days=days), 10.00)]
+
+    matched, unmatched_cc, unmatched_amazon = reconcile_amazon_orders(cc_transactions, orders)
+
+    assert len(matched) == int(matches)
+    assert len(unmatched_cc) == int(not matches)
+    assert len(unmatched_amazon) == int(not matches)
+
+def test_match_takes_first_unconsumed_transaction_in_statement_order(tmp_path):
+    orders = load_orders(tmp_path, [
+        ("A", "2024-01-05", "10.00", None, None),
+        ("B", "2024-01-05", "10.00", None, None),
+        ("C", "2024-01-05", "10.00", None, None),
+    ])
+    # The first statement row is picked even though the second is closer in
+    # date, and each statement row is only used once
+    cc_transactions = [
+        transaction(datetime(2024, 1, 7), 10.00, "FIRST"),
+        transaction(datetime(2024, 1, 5), 10.00, "SECOND"),
+    ]
+
+    matched, unmatched_cc, unmatched_amazon = reconcile_amazon_orders(cc_transactions, orders)
+
+    assert matched[["amazon_order_id", "statement_description"]].values.tolist() == [
+        ["A", "FIRST"],
+        ["B", "SECOND"],
+    ]
+    assert unmatched_cc == []
+    assert unmatched_amazon["order id"].tolist() == ["C"]
+
+def test_match_split_payments(tmp_path):
+    orders = load_orders(tmp_path, [
+        ("A", "2024-01-05", "15.00", "January 5, 2024: $10.00; January 8, 2024: $5.00", None),
+    ])
+    cc_transactions = [
+        transaction(datetime(2024, 1, 5), 10.00),
+        transaction(datetime(2024, 1, 9), 5.00),
+    ]
+
+    matched, unmatched_cc, unmatched_amazon = reconcile_amazon_orders(cc_transactions, orders)
+
+    assert matched[["amazon_order_id", "amazon_date", "amazon_amount"]].values.tolist() == [
+        ["A", pd.Timestamp(2024, 1, 5), 10.00],
+        ["A", pd.Timestamp(2024, 1, 8), 5.00],
+    ]
+    assert unmatched_cc == []
+    assert unmatched_amazon.empty
+
+def test_match_requires_exact_cents(tmp_path):
+    orders = load_orders(tmp_path, [("A", "2024-01-05", "10.00", None, None)])
+    cc_transactions = [transaction(datetime(2024, 1, 5), 9.99)]
+
+    matched, unmatched_cc, unmatched_amazon = reconcile_amazon_orders(cc_transactions, orders)
+
+    assert matched.empty
+    assert unmatched_cc == cc_transactions
+    assert unmatched_amazon["order id"].tolist() == ["A"]
+
+def test_refund_statement_rows_are_only_used_once(tmp_path):
+    orders = load_orders(tmp_path, [
+        ("A", "2024-01-05", "5.00", None, "5.00"),
+        ("B", "2024-01-05", "5.00", None, "5.00"),
+    ])
+    statement_refunds = [transaction(datetime(2024, 1, 6), -5.00)]
+
+    matched_refunds, unmapped_refunds = process_refunds(orders, statement_refunds)
+
+    assert matched_refunds["amazon_order_id"].tolist() == ["A"]
+    assert unmapped_refunds["order id"].tolist() == ["B"]
+
+def test_refund_matches_earliest_statement_refund_on_or_after_amazon_date(tmp_path):
+    orders = load_orders(tmp_path, [("A", "2024-01-05", "5.00", None, "5.00")])
+    # Out of date order, with one refund before the Amazon date
+    statement_refunds = [
+        transaction(datetime(2024, 1, 10), -5.00),
+        transaction(datetime(2024, 1, 4), -5.00),
+        transaction(datetime(2024, 1, 6), -5.00),
+    ]
+
+    matched_refunds, unmapped_refunds = process_refunds(orders, statement_refunds)
+
+    assert matched_refunds["statement_refund_date"].tolist() == [datetime(2024, 1, 6)]
+    assert unmapped_refunds.empty